@@ -1,28 +1,53 @@
 # -*- coding: utf-8 -*-
 
-import psycopg
-import paramiko
-import requests
 import configparser
+import sys
 import time
+
+BOOT_STARTED = time.monotonic()  # reference for the time-to-first-snapshot report
+config = configparser.ConfigParser()
+config.read('config.ini')
+ASYNC_MODE = config['general'].get('async_mode', 'threading')
+_gevent_monkey = sys.modules.get('gevent.monkey')
+if _gevent_monkey and _gevent_monkey.is_module_patched('socket'):
+    # Already patched by the server (e.g. gunicorn -k gevent)
+    ASYNC_MODE = 'gevent'
+elif ASYNC_MODE == 'gevent':
+    # Must run before paramiko, requests and psycopg create sockets or locks
+    from gevent import monkey
+    monkey.patch_all()
+
+# Database and SSH drivers are only loaded when a server of that type is configured
+SERVER_TYPES = {config[section].get('type') for section in config.sections()}
+if 'linux' in SERVER_TYPES:
+    import paramiko
+if SERVER_TYPES & {'postgres', 'pgbouncer'}:
+    import psycopg
+
+import requests
 import threading
 import json
 import sqlite3
 import os
 import html
-import smtplib
+import math
+import operator
 import urllib3
 import fcntl
 import re
+import csv
+import io
+import struct
 
-from flask import Flask, render_template, request
+from array import array
+
+from flask import Flask, Response, render_template, request, stream_with_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from decimal import Decimal
-from contextlib import closing
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from bisect import bisect_left
+from contextlib import closing, contextmanager
 
 
 class CustomJSONEncoder(json.JSONEncoder):
@@ -35,18 +60,19 @@ class CustomJSONEncoder(json.JSONEncoder):
 
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-config = configparser.ConfigParser()
-config.read('config.ini')
 DEFAULT_ENV = config['environments']['default_env']
 REFRESH_RATE = float(config['general']['refresh_rate'])
 
 app = Flask(__name__)
 app.json_encoder = CustomJSONEncoder
 app.config['SECRET_KEY'] = config['general']['secret_key']
-socketio = SocketIO(app, async_mode='threading', cors_allowed_origins="*")
+socketio = SocketIO(app, async_mode=ASYNC_MODE, cors_allowed_origins="*")
 
 DATABASE = 'nedara_monitoring.db'
+EXPORT_CHUNK_SIZE = 10000
 SCHEMA = """
+PRAGMA journal_mode=WAL;
+
 CREATE TABLE IF NOT EXISTS chart_data (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     chart_id TEXT NOT NULL,
@@ -65,11 +91,39 @@ CREATE TABLE IF NOT EXISTS chart_config (
 );
 """
 
+collectors_started = False
+collectors_stop = threading.Event()
 server_data_cache = {}    # {environment: data_dict}
 client_environments = {}  # {sid: environment}
+client_states = {}        # {sid: delivery state, see _new_client_state}
+clients_lock = threading.Lock()
+SNAPSHOT_ACK_TIMEOUT = 30  # seconds before an unacknowledged snapshot is considered lost
+collector_metrics = {}    # {environment: metrics dict, see _new_collector_metrics}
+metrics_lock = threading.Lock()
+_collector_context = threading.local()  # environment/target of the running collector task
+TIMING_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+alert_states = {}         # {(environment, rule, target): state, see _new_alert_state}
+alerts_lock = threading.Lock()
+ALERT_RULE_RE = re.compile(
+    r'^(?P<selector>[\w-]+)\.(?P<metric>\w+)\s+(?P<zscore>zscore\s+)?(?P<op>>=|<=|>|<)\s*(?P<threshold>-?\d+(?:\.\d+)?)'
+    r'(?:\s+for\s+(?P<duration>\d+(?:\.\d+)?)(?P<unit>[smh]?))?$'
+)
+ALERT_OPS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+EWMA_ALPHA = 0.05   # weight of the newest sample in the rolling mean and variance
+EWMA_WARMUP = 30    # samples before a z-score rule may fire
 TMP_DIR = os.path.join(os.path.dirname(__file__), "tmp")
-os.makedirs(TMP_DIR, exist_ok=True)
+HISTORY_CHARTS = ('CPUChart', 'httpRequestsChart', 'RAMChart', 'LoadAvgChart', 'NetworkChart', 'DiskIOChart')
+HISTORY_CACHE_POINTS = int(config['general'].get('chart_history', 5000))
+history_cache = {}        # {(environment, chart_id, series_name): latest points, see _load_history}
+history_lock = threading.Lock()
+
+
+mail_lock = threading.Lock()  # serializes senders in this process (patched under gevent)
+
+
 def _mail_files(environment):
+    os.makedirs(TMP_DIR, exist_ok=True)
     safe = re.sub(r'[^a-zA-Z0-9_-]', '_', environment)
     return (
         os.path.join(TMP_DIR, f"error_mail_{safe}.lock"),
@@ -77,6 +131,283 @@ def _mail_files(environment):
     )
 
 
+def _new_client_state():
+    return {
+        'visible': True,
+        'min_interval': REFRESH_RATE,
+        'sent_seq': 0,
+        'last_sent': 0.0,
+        'awaiting_ack': False,
+    }
+
+
+def _client_due(state, seq, now):
+    if not state['visible'] or state['sent_seq'] >= seq:
+        return False
+    if state['awaiting_ack'] and now - state['last_sent'] < SNAPSHOT_ACK_TIMEOUT:
+        return False
+    return now - state['last_sent'] >= state['min_interval']
+
+
+def push_server_data(environment, sids=None):
+    """Send the latest snapshot of an environment to its clients (or only `sids`).
+
+    A client only gets a new snapshot once it has acknowledged the previous one,
+    is visible, and its declared refresh interval has elapsed. Intermediate
+    snapshots are never queued, so at most one is in flight per socket.
+    """
+    data = server_data_cache.get(environment)
+    if not data:
+        return
+    now = time.monotonic()
+    with clients_lock:
+        targets = [
+            sid for sid, state in client_states.items()
+            if (sids is None or sid in sids)
+            and client_environments.get(sid) == environment
+            and _client_due(state, data['seq'], now)
+        ]
+        for sid in targets:
+            client_states[sid].update(sent_seq=data['seq'], last_sent=now, awaiting_ack=True)
+    if targets:
+        socketio.emit('server_data_update', data, to=targets)
+
+
+def _new_collector_metrics():
+    return {
+        'ticks': 0,
+        'overruns': 0,
+        'last_tick_ms': 0.0,
+        'first_snapshot_s': None,
+        'pending_targets': 0,
+        'timings': {},  # {target: {phase: histogram}}
+        'errors': {},   # {target: {'message', 'at'}}
+    }
+
+
+def _new_histogram():
+    return {'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(TIMING_BUCKETS_MS) + 1)}
+
+
+def record_timing(environment, target, phase, elapsed_ms):
+    with metrics_lock:
+        metrics = collector_metrics.setdefault(environment, _new_collector_metrics())
+        hist = metrics['timings'].setdefault(target, {}).setdefault(phase, _new_histogram())
+        hist['count'] += 1
+        hist['sum_ms'] += elapsed_ms
+        hist['max_ms'] = max(hist['max_ms'], elapsed_ms)
+        hist['buckets'][bisect_left(TIMING_BUCKETS_MS, elapsed_ms)] += 1
+
+
+def record_error(environment, target, error):
+    with metrics_lock:
+        metrics = collector_metrics.setdefault(environment, _new_collector_metrics())
+        metrics['errors'][target] = {'message': str(error), 'at': datetime.now().isoformat(timespec='seconds')}
+
+
+@contextmanager
+def timed(phase, target=None):
+    """Record the duration of the enclosed block for the current collector task."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(
+            getattr(_collector_context, 'environment', DEFAULT_ENV),
+            target or getattr(_collector_context, 'target', 'collector'),
+            phase,
+            (time.perf_counter() - start) * 1000,
+        )
+
+
+def _histogram_summary(hist):
+    # Percentiles are reported as the upper bound of the matching bucket
+    def percentile(pct):
+        threshold, seen = hist['count'] * pct / 100, 0
+        for bound, n in zip(TIMING_BUCKETS_MS + (hist['max_ms'],), hist['buckets']):
+            seen += n
+            if seen >= threshold:
+                return min(bound, hist['max_ms'])
+        return hist['max_ms']
+
+    return {
+        'count': hist['count'],
+        'avg_ms': round(hist['sum_ms'] / hist['count'], 2) if hist['count'] else 0.0,
+        'p50_ms': round(percentile(50), 2),
+        'p95_ms': round(percentile(95), 2),
+        'max_ms': round(hist['max_ms'], 2),
+    }
+
+
+def get_collector_status(environment):
+    with metrics_lock:
+        metrics = collector_metrics.get(environment, _new_collector_metrics())
+        status = {
+            'environment': environment,
+            'refresh_rate': REFRESH_RATE,
+            'ticks': metrics['ticks'],
+            'overruns': metrics['overruns'],
+            'last_tick_ms': round(metrics['last_tick_ms'], 2),
+            'first_snapshot_seconds': metrics['first_snapshot_s'] and round(metrics['first_snapshot_s'], 2),
+            'pending_targets': metrics['pending_targets'],
+            'timings': {
+                target: {phase: _histogram_summary(hist) for phase, hist in phases.items()}
+                for target, phases in metrics['timings'].items()
+            },
+            'errors': dict(metrics['errors']),
+        }
+    with clients_lock:
+        states = [client_states[sid] for sid, env in client_environments.items()
+                  if env == environment and sid in client_states]
+    status['alerts'] = get_active_alerts(environment)
+    status['clients'] = len(states)
+    status['clients_awaiting_ack'] = sum(1 for state in states if state['awaiting_ack'])
+    status['clients_hidden'] = sum(1 for state in states if not state['visible'])
+    return status
+
+
+def load_alert_rules():
+    """Parse the [alerts] section, one rule per key:
+
+        name = <type or server>.<metric> [zscore] <op> <threshold> [for <n>[s|m|h]]
+    """
+    rules = []
+    if not config.has_section('alerts'):
+        return rules
+    for name, expr in config['alerts'].items():
+        match = ALERT_RULE_RE.match(expr.strip())
+        if not match:
+            print(f"Ignoring invalid alert rule {name!r}: {expr}")
+            continue
+        rules.append({
+            'name': name,
+            'expr': expr.strip(),
+            'selector': match['selector'],
+            'metric': match['metric'],
+            'zscore': bool(match['zscore']),
+            'op': ALERT_OPS[match['op']],
+            'threshold': float(match['threshold']),
+            'for': float(match['duration'] or 0) * DURATION_UNITS[match['unit'] or ''],
+        })
+    return rules
+
+
+ALERT_RULES = load_alert_rules()
+
+
+def _new_alert_state():
+    return {'since': None, 'firing': False, 'notified': False, 'value': None, 'mean': 0.0, 'var': 0.0, 'count': 0}
+
+
+def _update_ewma(state, value):
+    # Z-score of `value` against the series so far, then fold it into the
+    # exponentially weighted mean and variance
+    if state['count'] == 0:
+        state['mean'] = value
+    zscore = None
+    if state['count'] >= EWMA_WARMUP and state['var'] > 0:
+        zscore = (value - state['mean']) / math.sqrt(state['var'])
+    diff = value - state['mean']
+    state['mean'] += EWMA_ALPHA * diff
+    state['var'] = (1 - EWMA_ALPHA) * (state['var'] + EWMA_ALPHA * diff * diff)
+    state['count'] += 1
+    return zscore
+
+
+def evaluate_alerts(environment, stats):
+    """Evaluate ALERT_RULES against one snapshot and mail the rules that are firing.
+
+    Only values already collected in `stats` are used, nothing is queried.
+    A rule fires once its condition has held for its `for` duration, and
+    again only after it has cleared or its target had no value for a
+    snapshot. When mail is configured, its mail is retried on every
+    snapshot while it fires until send_notification_mail accepts it (alert
+    mails have their own rate limit per environment, separate from the
+    outage mails).
+    """
+    now = time.monotonic()
+    pending = []
+    evaluated = set()
+    mail_enabled = mail_configured()
+    with alerts_lock:
+        for rule in ALERT_RULES:
+            for target, server_data in stats.items():
+                if server_data.get('error') or rule['selector'] not in (server_data.get('type'), target):
+                    continue
+                try:
+                    value = float(server_data[rule['metric']])
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+                evaluated.add((environment, rule['name'], target))
+                state = alert_states.setdefault((environment, rule['name'], target), _new_alert_state())
+                observed = _update_ewma(state, value) if rule['zscore'] else value
+                state['value'] = value
+                if observed is None or not rule['op'](observed, rule['threshold']):
+                    if state['firing']:
+                        print(f"[{environment}] Alert resolved: {rule['name']} on {target}")
+                    state['since'], state['firing'], state['notified'] = None, False, False
+                    continue
+
+                if state['since'] is None:
+                    state['since'] = now
+                if not state['firing'] and now - state['since'] >= rule['for']:
+                    state['firing'] = True
+                    print(f"[{environment}] Alert firing: {rule['name']} on {target} ({value:g})")
+                if mail_enabled and state['firing'] and not state['notified']:
+                    pending.append((rule, target, value, observed, state))
+
+        # A target without a value this snapshot (error, gone from stats,
+        # metric missing) no longer holds its rules: the hold restarts from
+        # its next valid value. The EWMA baseline is kept.
+        for key, state in alert_states.items():
+            if key[0] != environment or key in evaluated or state['since'] is None:
+                continue
+            if state['firing']:
+                print(f"[{environment}] Alert resolved: {key[1]} on {key[2]} (no value)")
+            state['since'], state['firing'], state['notified'] = None, False, False
+
+    for rule, target, value, observed, state in pending:
+        details = {'Rule': html.escape(rule['expr']), 'Server': target, 'Value': f"{value:g}"}
+        if rule['zscore']:
+            details['Z-score'] = f"{observed:.2f}"
+        details['Environment'] = environment
+        sent = send_notification_mail({
+            'subject': f"⚠️ Nedara Monitoring — Alert: {rule['name']} ({target})",
+            'body': _build_mail_body(
+                title=f"Alert: {rule['name']}",
+                description='A monitored metric has crossed its alert threshold.'
+                            + (f" The condition held for {rule['for']:g} seconds." if rule['for'] else ''),
+                details=details,
+                environment=environment,
+            ),
+        }, environment, rate_limit_key=f"{environment}_alerts")
+        if sent:
+            with alerts_lock:
+                # Unless it cleared while the mail was being sent
+                state['notified'] = state['firing']
+
+
+def get_active_alerts(environment):
+    now = time.monotonic()
+    mail_enabled = mail_configured()
+    with alerts_lock:
+        return [
+            {
+                'rule': rule, 'target': target, 'value': state['value'],
+                'for_seconds': round(now - state['since']), 'notified': state['notified'] if mail_enabled else None,
+            }
+            for (env, rule, target), state in alert_states.items()
+            if env == environment and state['firing']
+        ]
+
+
+def ssh_exec(ssh, phase, command):
+    with timed(f'ssh_{phase}'):
+        stdin, stdout, stderr = ssh.exec_command(command)
+        return stdout.read().decode().strip()
+
+
 def init_db():
     with closing(connect_db()) as db:
         db.executescript(SCHEMA)
@@ -87,6 +418,15 @@ def connect_db():
     return sqlite3.connect(DATABASE)
 
 
+def run_blocking(func, *args):
+    # sqlite3 never yields to gevent, so under gevent its calls run in the
+    # hub's thread pool. `func` must not touch patched locks or greenlets.
+    if ASYNC_MODE == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+
 def _build_mail_body(title, description, details, environment):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     rows_html = ''.join(
@@ -161,12 +501,29 @@ def _build_mail_body(title, description, details, environment):
 </html>"""
 
 
-def send_notification_mail(data, environment='default'):
+def mail_configured():
     general_config = config['general']
-    lock_file_path, state_file_path = _mail_files(environment)
+    return bool(
+        general_config.get('email_notif_smtp_server') and
+        general_config.get('email_notif_smtp_port') and
+        general_config.get('email_notif_login') and
+        general_config.get('email_notif_password') and
+        general_config.get('email_notif_recipients')
+    )
+
+
+def send_notification_mail(data, environment='default', rate_limit_key=None):
+    """Send `data` (subject, html body) at most once per 15 minutes per
+    `rate_limit_key`, which defaults to the environment. Returns whether it
+    was sent."""
+    general_config = config['general']
+    lock_file_path, state_file_path = _mail_files(rate_limit_key or environment)
 
     try:
-        with open(lock_file_path, "w") as lock_file:
+        # flock only coordinates with other processes: under gevent all
+        # collectors share one OS thread, and a second flock while the
+        # holder is waiting on SMTP would block the whole event loop
+        with mail_lock, open(lock_file_path, "w") as lock_file:
             fcntl.flock(lock_file, fcntl.LOCK_EX)
 
             last_sent = None
@@ -177,17 +534,14 @@ def send_notification_mail(data, environment='default'):
                         last_sent = datetime.fromisoformat(ts)
 
             can_send = not last_sent or (datetime.now() - last_sent > timedelta(minutes=15))
-            has_mail_config = (
-                general_config.get('email_notif_smtp_server') and
-                general_config.get('email_notif_smtp_port') and
-                general_config.get('email_notif_login') and
-                general_config.get('email_notif_password') and
-                general_config.get('email_notif_recipients')
-            )
 
-            if not can_send or not has_mail_config:
+            if not can_send or not mail_configured():
                 return False
 
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+
             recipients = [email.strip() for email in general_config['email_notif_recipients'].split(',')]
 
             msg = MIMEMultipart('alternative')
@@ -216,17 +570,78 @@ def send_notification_mail(data, environment='default'):
         return False
 
 
-def save_chart_data(chart_id, series_name, timestamp, value, environment):
+def _insert_chart_points(points, environment):
     with closing(connect_db()) as db:
-        try:
-            db.execute(
-                "INSERT OR IGNORE INTO chart_data (chart_id, series_name, timestamp, value, environment) "
-                "VALUES (?, ?, ?, ?, ?)",
-                (chart_id, series_name, timestamp, value, environment)
-            )
-            db.commit()
-        except sqlite3.Error as e:
-            print(f"Error saving chart data: {e}")
+        db.executemany(
+            "INSERT OR IGNORE INTO chart_data (chart_id, series_name, timestamp, value, environment) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [point + (environment,) for point in points]
+        )
+        db.commit()
+
+
+def save_chart_points(points, environment):
+    """Store (chart_id, series_name, timestamp, value) points in one transaction."""
+    try:
+        run_blocking(_insert_chart_points, points, environment)
+    except sqlite3.Error as e:
+        print(f"Error saving chart data: {e}")
+        return
+    for chart_id, series_name, timestamp, value in points:
+        cache_chart_point(chart_id, series_name, timestamp, value, environment)
+
+
+def cache_chart_point(chart_id, series_name, timestamp, value, environment):
+    with history_lock:
+        entry = history_cache.get((environment, chart_id, series_name))
+        if entry is None or (entry['times'] and entry['times'][-1] >= timestamp):
+            return
+        entry['times'].append(timestamp)
+        entry['values'].append(value)
+        if len(entry['times']) > 2 * HISTORY_CACHE_POINTS:
+            del entry['times'][:-HISTORY_CACHE_POINTS]
+            del entry['values'][:-HISTORY_CACHE_POINTS]
+            entry['complete'] = False
+
+
+def get_cached_chart_data(chart_id, series_name, max_points, environment):
+    """Return the latest `max_points` (timestamps, values), oldest first, or None
+    when the series is not cached (yet) or the cache holds fewer points."""
+    if not isinstance(max_points, int) or max_points <= 0:
+        return None
+    with history_lock:
+        entry = history_cache.get((environment, chart_id, series_name))
+        if entry is None or (len(entry['times']) < max_points and not entry['complete']):
+            return None
+        return entry['times'][-max_points:].tolist(), entry['values'][-max_points:].tolist()
+
+
+def _load_history(environment, chart_id, series_name):
+    # Called with history_lock held, so a point saved while the query runs is
+    # either in its result or appended afterwards by cache_chart_point
+    rows = run_blocking(get_chart_data, chart_id, series_name, HISTORY_CACHE_POINTS, environment)
+    rows.reverse()
+    history_cache[(environment, chart_id, series_name)] = {
+        'times': array('q', (row[0] for row in rows)),
+        'values': array('d', (row[1] for row in rows)),
+        'complete': len(rows) < HISTORY_CACHE_POINTS,  # nothing older in SQLite
+    }
+
+
+def warm_history_cache():
+    """Load the latest chart_history points of every chart series from SQLite."""
+    started = time.perf_counter()
+    series = 0
+    for environment in get_available_environments():
+        for server_name in get_environment_config(environment)['servers']:
+            server_config = get_server_config(server_name)
+            if server_config.get('type') != 'linux':
+                continue
+            for chart_id in HISTORY_CHARTS:
+                with history_lock:
+                    _load_history(environment, chart_id, server_config['chart_label'])
+                series += 1
+    print(f"Chart history cache warmed: {series} series in {time.perf_counter() - started:.2f}s")
 
 
 def get_chart_data(chart_id, series_name, max_points, environment):
@@ -239,6 +654,100 @@ def get_chart_data(chart_id, series_name, max_points, environment):
         return cursor.fetchall()
 
 
+def connect_db_readonly():
+    return sqlite3.connect(f"file:{DATABASE}?mode=ro", uri=True, check_same_thread=False)
+
+
+def iter_chart_data(environment, chart_ids=None, series_names=None, start=None, end=None):
+    """Yield lists of (chart_id, series_name, timestamp, value) rows, at most
+    EXPORT_CHUNK_SIZE at a time, ordered by series then timestamp.
+
+    Each chunk is a separate short read resuming after the previous chunk's
+    last row (keyset paging), so a slow download never keeps a read snapshot
+    open, which would block the collector's writes in rollback-journal mode
+    and WAL checkpoints in WAL mode.
+    """
+    query = "SELECT chart_id, series_name, timestamp, value FROM chart_data WHERE environment = ?"
+    params = [environment]
+    if chart_ids:
+        query += f" AND chart_id IN ({', '.join('?' * len(chart_ids))})"
+        params.extend(chart_ids)
+    if series_names:
+        query += f" AND series_name IN ({', '.join('?' * len(series_names))})"
+        params.extend(series_names)
+    if start is not None:
+        query += " AND timestamp >= ?"
+        params.append(start)
+    if end is not None:
+        query += " AND timestamp <= ?"
+        params.append(end)
+    order = " ORDER BY chart_id, series_name, timestamp LIMIT ?"
+
+    with closing(connect_db_readonly()) as db:
+        rows = db.execute(query + order, params + [EXPORT_CHUNK_SIZE]).fetchall()
+        while rows:
+            yield rows
+            if len(rows) < EXPORT_CHUNK_SIZE:
+                break
+            rows = db.execute(
+                query + " AND (chart_id, series_name, timestamp) > (?, ?, ?)" + order,
+                params + list(rows[-1][:3]) + [EXPORT_CHUNK_SIZE],
+            ).fetchall()
+
+
+def _export_csv(chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(('chart_id', 'series_name', 'timestamp', 'value'))
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _export_ndjson(chunks):
+    for rows in chunks:
+        yield ''.join(
+            json.dumps({'chart_id': r[0], 'series_name': r[1], 'time': r[2], 'value': r[3]}) + '\n'
+            for r in rows
+        )
+
+
+def _pack_columns(chart_id, series_name, timestamps, values):
+    # Frame: uint32 header length, JSON header, int64[count] timestamps, float64[count] values (little-endian)
+    if sys.byteorder != 'little':
+        timestamps.byteswap()
+        values.byteswap()
+    header = json.dumps({'chart_id': chart_id, 'series_name': series_name, 'count': len(timestamps)}).encode()
+    return struct.pack('<I', len(header)) + header + timestamps.tobytes() + values.tobytes()
+
+
+def _export_columnar(chunks):
+    for rows in chunks:
+        out = []
+        key, timestamps, values = None, array('q'), array('d')
+        for chart_id, series_name, ts, value in rows:
+            if (chart_id, series_name) != key:
+                if key and timestamps:
+                    out.append(_pack_columns(*key, timestamps, values))
+                key, timestamps, values = (chart_id, series_name), array('q'), array('d')
+            timestamps.append(int(ts))
+            values.append(float(value))
+        if key and timestamps:
+            out.append(_pack_columns(*key, timestamps, values))
+        yield b''.join(out)
+
+
+EXPORT_FORMATS = {
+    'csv':      ('text/csv', _export_csv),
+    'ndjson':   ('application/x-ndjson', _export_ndjson),
+    'columnar': ('application/octet-stream', _export_columnar),
+}
+
+
 def save_chart_config(chart_id, max_points, chart_type):
     with closing(connect_db()) as db:
         db.execute(
@@ -290,13 +799,7 @@ def get_widget_config(environment):
         'chart_history': general_config['chart_history'],
         'chart_info': {},
         'chart_adaptive_display': general_config.get('chart_adaptive_display', '0') == '0',
-        'email_configured': bool(
-            config['general'].get('email_notif_smtp_server') and
-            config['general'].get('email_notif_smtp_port') and
-            config['general'].get('email_notif_login') and
-            config['general'].get('email_notif_password') and
-            config['general'].get('email_notif_recipients')
-        ),
+        'email_configured': mail_configured(),
     }
     for server_name in env_config['servers']:
         server_config = get_server_config(server_name)
@@ -319,22 +822,24 @@ def get_postgres_stats(postgres_config, environment='default'):
         postgres_config.pop('name', None)
         postgres_config['dbname'] = postgres_config.pop('database', None)
         postgres_config.setdefault('connect_timeout', 10)
-        conn = psycopg.connect(**postgres_config)
+        with timed('pg_connect'):
+            conn = psycopg.connect(**postgres_config)
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                datname,
-                usename,
-                state,
-                query,
-                wait_event_type,
-                wait_event,
-                GREATEST(EXTRACT(EPOCH FROM (NOW() - state_change)), 0) AS wait_time_seconds
-            FROM pg_stat_activity
-            WHERE state IN ('active', 'idle in transaction')
-            ORDER BY wait_time_seconds DESC;
-        """)
-        active_queries = cursor.fetchall()
+        with timed('pg_activity'):
+            cursor.execute("""
+                SELECT
+                    datname,
+                    usename,
+                    state,
+                    query,
+                    wait_event_type,
+                    wait_event,
+                    GREATEST(EXTRACT(EPOCH FROM (NOW() - state_change)), 0) AS wait_time_seconds
+                FROM pg_stat_activity
+                WHERE state IN ('active', 'idle in transaction')
+                ORDER BY wait_time_seconds DESC;
+            """)
+            active_queries = cursor.fetchall()
 
         active_queries = [
             (
@@ -353,15 +858,17 @@ def get_postgres_stats(postgres_config, environment='default'):
         total_wait_time_idle = sum(query[6] for query in idle_queries_list if query[6] is not None)
         avg_wait_time_idle = total_wait_time_idle / len(idle_queries_list) if idle_queries_list else 0.0
 
-        cursor.execute("SELECT pg_database_size(%s);", (main_db,))
-        db_size = cursor.fetchone()[0]
+        with timed('pg_db_size'):
+            cursor.execute("SELECT pg_database_size(%s);", (main_db,))
+            db_size = cursor.fetchone()[0]
 
-        cursor.execute("""
-            SELECT datname FROM pg_database
-            WHERE datistemplate = false AND datname != 'postgres'
-            ORDER BY datname;
-        """)
-        all_databases = [db[0] for db in cursor.fetchall()]
+        with timed('pg_databases'):
+            cursor.execute("""
+                SELECT datname FROM pg_database
+                WHERE datistemplate = false AND datname != 'postgres'
+                ORDER BY datname;
+            """)
+            all_databases = [db[0] for db in cursor.fetchall()]
 
         cursor.close()
         conn.close()
@@ -373,6 +880,7 @@ def get_postgres_stats(postgres_config, environment='default'):
             'db_size_gb': f"{db_size / (1024 * 1024 * 1024):.2f}",
             'avg_wait_time_active': float(avg_wait_time_active),
             'avg_wait_time_idle': float(avg_wait_time_idle),
+            'max_wait_time_idle': max((query[6] for query in idle_queries_list), default=0.0),
             'all_databases': all_databases,
             'type': server_type,
             'main_db': main_db,
@@ -394,25 +902,24 @@ def get_server_stats(server_config, environment='default'):
     try:
         ssh = paramiko.SSHClient()
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(
-            server_config['host'],
-            username=server_config['user'],
-            password=server_config['password'],
-            timeout=5,
-        )
+        with timed('ssh_connect'):
+            ssh.connect(
+                server_config['host'],
+                port=server_config.get('port', 22),
+                username=server_config['user'],
+                password=server_config['password'],
+                timeout=5,
+            )
 
-        stdin, stdout, stderr = ssh.exec_command("top -bn1 | grep 'Cpu(s)' | sed 's/.*, *\\([0-9.]*\\)%* id.*/\\1/' | awk '{print 100 - $1}'")
-        cpu_usage = stdout.read().decode().strip()
+        cpu_usage = ssh_exec(ssh, 'cpu', "top -bn1 | grep 'Cpu(s)' | sed 's/.*, *\\([0-9.]*\\)%* id.*/\\1/' | awk '{print 100 - $1}'")
 
-        stdin, stdout, stderr = ssh.exec_command("free -m | grep Mem | awk '{print $2, $3, $7}'")
-        ram_stats = stdout.read().decode().strip().split()
+        ram_stats = ssh_exec(ssh, 'ram', "free -m | grep Mem | awk '{print $2, $3, $7}'").split()
         ram_total = int(ram_stats[0])
         ram_used = int(ram_stats[1])
         ram_available = int(ram_stats[2])
         ram_usage_percent = round((ram_used / ram_total) * 100, 2)
 
-        stdin, stdout, stderr = ssh.exec_command("df -B1 / | tail -1 | awk '{print $2, $3, $4}'")
-        storage_stats = stdout.read().decode().strip().split()
+        storage_stats = ssh_exec(ssh, 'storage', "df -B1 / | tail -1 | awk '{print $2, $3, $4}'").split()
         storage_size_bytes = int(storage_stats[0])
         storage_used_bytes = int(storage_stats[1])
         storage_available_bytes = int(storage_stats[2])
@@ -427,8 +934,7 @@ def get_server_stats(server_config, environment='default'):
 
         logs = ""
         if server_config.get('log_file'):
-            stdin, stdout, stderr = ssh.exec_command(f"tail -n 500 {server_config.get('log_file')}")
-            logs = stdout.read().decode().strip()
+            logs = ssh_exec(ssh, 'logs', f"tail -n 500 {server_config.get('log_file')}")
 
         http_requests = '0'
         if server_config.get('nginx_access_file'):
@@ -443,27 +949,25 @@ def get_server_stats(server_config, environment='default'):
                 f"}} END {{ print count+0 }}' "
                 f"{server_config['nginx_access_file']}"
             )
-            stdin, stdout, stderr = ssh.exec_command(cmd)
-            parts = stdout.read().decode().strip().split()
+            parts = ssh_exec(ssh, 'nginx', cmd).split()
             http_requests = parts[0] if parts else '0'
 
         # Load average (1-minute)
-        stdin, stdout, stderr = ssh.exec_command("awk '{print $1}' /proc/loadavg")
-        load_avg = stdout.read().decode().strip() or '0'
+        load_avg = ssh_exec(ssh, 'loadavg', "awk '{print $1}' /proc/loadavg") or '0'
 
         # Cumulative network bytes (all non-loopback interfaces)
-        stdin, stdout, stderr = ssh.exec_command(
+        net_parts = ssh_exec(
+            ssh, 'net',
             "awk 'NR>2 && !/lo:/{gsub(/:/, \"\", $1); rx+=$2; tx+=$10} END{print rx+0, tx+0}' /proc/net/dev"
-        )
-        net_parts = stdout.read().decode().strip().split()
+        ).split()
         net_rx_bytes = int(net_parts[0]) if net_parts else 0
         net_tx_bytes = int(net_parts[1]) if len(net_parts) > 1 else 0
 
         # Cumulative disk I/O bytes (main block devices, not partitions)
-        stdin, stdout, stderr = ssh.exec_command(
+        disk_parts = ssh_exec(
+            ssh, 'diskstats',
             "awk '$3~/^(sd[a-z]|vd[a-z]|nvme[0-9]n[0-9]|xvd[a-z])$/{r+=$6;w+=$10} END{print r*512+0, w*512+0}' /proc/diskstats"
-        )
-        disk_parts = stdout.read().decode().strip().split()
+        ).split()
         disk_read_bytes  = int(disk_parts[0]) if disk_parts else 0
         disk_write_bytes = int(disk_parts[1]) if len(disk_parts) > 1 else 0
 
@@ -507,16 +1011,17 @@ def get_processes_stats(server_config):
     try:
         ssh = paramiko.SSHClient()
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(
-            server_config['host'],
-            username=server_config['user'],
-            password=server_config['password'],
-            timeout=5,
-        )
+        with timed('ssh_connect'):
+            ssh.connect(
+                server_config['host'],
+                port=server_config.get('port', 22),
+                username=server_config['user'],
+                password=server_config['password'],
+                timeout=5,
+            )
 
         cmd = "ps aux --sort=-%cpu | head -n 20 | awk '{print $1,$2,$3,$4,$11}'"
-        stdin, stdout, stderr = ssh.exec_command(cmd)
-        processes = stdout.read().decode().strip().split('\n')
+        processes = ssh_exec(ssh, 'processes', cmd).split('\n')
         processes = processes[1:] if len(processes) > 1 else []
 
         ssh.close()
@@ -547,7 +1052,8 @@ def check_web_status(environment):
     env_config = get_environment_config(environment)
     web_url = env_config['url']
     try:
-        response = requests.get(web_url, verify=False, timeout=5)
+        with timed('http', target='web'):
+            response = requests.get(web_url, verify=False, timeout=5)
         response_time = response.elapsed.total_seconds() * 1000
         if response.status_code == 200:
             return {
@@ -591,31 +1097,35 @@ def check_web_status(environment):
 def get_pgbouncer_stats(pgbouncer_config):
     pgb_name = pgbouncer_config.get('name', 'pgbouncer')
     try:
-        conn = psycopg.connect(
-            host=pgbouncer_config['host'],
-            port=int(pgbouncer_config.get('port', 6432)),
-            dbname=pgbouncer_config.get('database', 'pgbouncer'),
-            user=pgbouncer_config['user'],
-            password=pgbouncer_config.get('password', ''),
-            connect_timeout=5,
-            autocommit=True,
-        )
+        with timed('pgb_connect'):
+            conn = psycopg.connect(
+                host=pgbouncer_config['host'],
+                port=int(pgbouncer_config.get('port', 6432)),
+                dbname=pgbouncer_config.get('database', 'pgbouncer'),
+                user=pgbouncer_config['user'],
+                password=pgbouncer_config.get('password', ''),
+                connect_timeout=5,
+                autocommit=True,
+            )
         cursor = conn.cursor()
 
-        cursor.execute("SHOW POOLS;")
-        pool_cols = [desc[0] for desc in cursor.description]
-        pools = [dict(zip(pool_cols, row)) for row in cursor.fetchall()]
+        with timed('pgb_pools'):
+            cursor.execute("SHOW POOLS;")
+            pool_cols = [desc[0] for desc in cursor.description]
+            pools = [dict(zip(pool_cols, row)) for row in cursor.fetchall()]
 
-        cursor.execute("SHOW STATS;")
-        stats_cols = [desc[0] for desc in cursor.description]
-        stats = [dict(zip(stats_cols, row)) for row in cursor.fetchall()]
+        with timed('pgb_stats'):
+            cursor.execute("SHOW STATS;")
+            stats_cols = [desc[0] for desc in cursor.description]
+            stats = [dict(zip(stats_cols, row)) for row in cursor.fetchall()]
 
-        cursor.execute("SHOW CONFIG;")
-        cfg_cols = [desc[0] for desc in cursor.description]
-        pgb_cfg = {}
-        for row in cursor.fetchall():
-            r = dict(zip(cfg_cols, row))
-            pgb_cfg[r.get('key', r.get(cfg_cols[0], ''))] = r.get('value', r.get(cfg_cols[1], ''))
+        with timed('pgb_config'):
+            cursor.execute("SHOW CONFIG;")
+            cfg_cols = [desc[0] for desc in cursor.description]
+            pgb_cfg = {}
+            for row in cursor.fetchall():
+                r = dict(zip(cfg_cols, row))
+                pgb_cfg[r.get('key', r.get(cfg_cols[0], ''))] = r.get('value', r.get(cfg_cols[1], ''))
 
         cursor.close()
         conn.close()
@@ -651,9 +1161,6 @@ def get_pgbouncer_stats(pgbouncer_config):
 
 
 def collect_server_data(environment):
-    if not os.path.exists(DATABASE):
-        init_db()
-
     env_config = get_environment_config(environment)
     server_names = env_config['servers']
 
@@ -670,30 +1177,44 @@ def collect_server_data(environment):
             show_pgbouncer_panel = True
 
     prev_net_disk = {}  # {server_name: {rx, tx, dr, dw, ts}}
+    _collector_context.environment = environment
+    _collector_context.target = 'collector'
 
-    while True:
+    while not collectors_stop.is_set():
+        tick_start = time.perf_counter()
         try:
             stats = {}
 
             def collect_one(server_name):
+                _collector_context.environment = environment
+                _collector_context.target = server_name
                 sc = get_server_config(server_name)
                 server_type = sc.get('type')
                 result = {}
-                if server_type == 'postgres':
-                    result[server_name] = get_postgres_stats(sc, environment)
-                elif server_type == 'linux':
-                    result[server_name] = get_server_stats(sc, environment)
-                    result[f"{server_name}_processes"] = get_processes_stats(sc)
-                elif server_type == 'pgbouncer':
-                    result[server_name] = get_pgbouncer_stats(sc)
+                with timed('collect'):
+                    if server_type == 'postgres':
+                        result[server_name] = get_postgres_stats(sc, environment)
+                    elif server_type == 'linux':
+                        result[server_name] = get_server_stats(sc, environment)
+                        result[f"{server_name}_processes"] = get_processes_stats(sc)
+                    elif server_type == 'pgbouncer':
+                        result[server_name] = get_pgbouncer_stats(sc)
+                for server_data in result.values():
+                    if server_data.get('error'):
+                        record_error(environment, server_name, server_data['error'])
                 return result
 
             with ThreadPoolExecutor(max_workers=max(len(server_names), 1)) as executor:
-                futures = [executor.submit(collect_one, name) for name in server_names]
+                futures = {executor.submit(collect_one, name): name for name in server_names}
+                with metrics_lock:
+                    collector_metrics.setdefault(environment, _new_collector_metrics())['pending_targets'] = len(futures)
                 for future in as_completed(futures, timeout=60):
+                    with metrics_lock:
+                        collector_metrics[environment]['pending_targets'] -= 1
                     try:
                         stats.update(future.result())
                     except Exception as e:
+                        record_error(environment, futures[future], e)
                         print(f"[{environment}] Error collecting server: {e}")
 
             # Compute network/disk rates from cumulative counters
@@ -716,6 +1237,12 @@ def collect_server_data(environment):
                 }
 
             web_status = check_web_status(environment)
+            if web_status.get('error') or web_status['status'] != 'Online':
+                record_error(environment, 'web', web_status.get('error') or web_status['status'])
+
+            if ALERT_RULES:
+                with timed('alerts'):
+                    evaluate_alerts(environment, stats)
 
             data = {
                 'stats': stats,
@@ -728,27 +1255,69 @@ def collect_server_data(environment):
                 'show_postgres_panel': show_postgres_panel,
                 'show_http_requests_panel': show_http_requests_panel,
                 'show_pgbouncer_panel': show_pgbouncer_panel,
+                'seq': server_data_cache.get(environment, {}).get('seq', 0) + 1,
+                'generated_at': time.time(),
             }
 
             server_data_cache[environment] = data
+            if data['seq'] == 1:
+                first_snapshot = time.monotonic() - BOOT_STARTED
+                with metrics_lock:
+                    collector_metrics.setdefault(environment, _new_collector_metrics())['first_snapshot_s'] = first_snapshot
+                print(f"[{environment}] First snapshot ready {first_snapshot:.2f}s after start")
 
             timestamp = int(datetime.now().timestamp())
+            points = []
             for server_name, server_data in stats.items():
                 if 'chart_label' in server_data and server_data.get('type') == 'linux':
                     chart_label = server_data['chart_label']
-                    save_chart_data('CPUChart',          chart_label, timestamp, float(server_data['cpu_usage']),        environment)
-                    save_chart_data('httpRequestsChart', chart_label, timestamp, float(server_data['http_requests']),    environment)
-                    save_chart_data('RAMChart',          chart_label, timestamp, float(server_data['ram_usage_percent']), environment)
-                    save_chart_data('LoadAvgChart',      chart_label, timestamp, float(server_data.get('load_avg', 0)),  environment)
-                    save_chart_data('NetworkChart',      chart_label, timestamp, float(server_data.get('net_mbps', 0)),  environment)
-                    save_chart_data('DiskIOChart',       chart_label, timestamp, float(server_data.get('disk_mbps', 0)), environment)
-
-            socketio.emit('server_data_update', data, room=environment)
+                    points += [
+                        ('CPUChart',          chart_label, timestamp, float(server_data['cpu_usage'])),
+                        ('httpRequestsChart', chart_label, timestamp, float(server_data['http_requests'])),
+                        ('RAMChart',          chart_label, timestamp, float(server_data['ram_usage_percent'])),
+                        ('LoadAvgChart',      chart_label, timestamp, float(server_data.get('load_avg', 0))),
+                        ('NetworkChart',      chart_label, timestamp, float(server_data.get('net_mbps', 0))),
+                        ('DiskIOChart',       chart_label, timestamp, float(server_data.get('disk_mbps', 0))),
+                    ]
+            if points:
+                with timed('sqlite_write'):
+                    save_chart_points(points, environment)
+
+            with timed('emit'):
+                push_server_data(environment)
 
         except Exception as e:
+            record_error(environment, 'collector', e)
             print(f"[{environment}] Error in collect_server_data: {e}")
 
-        time.sleep(REFRESH_RATE)
+        tick_ms = (time.perf_counter() - tick_start) * 1000
+        record_timing(environment, 'collector', 'tick', tick_ms)
+        with metrics_lock:
+            metrics = collector_metrics.setdefault(environment, _new_collector_metrics())
+            metrics['ticks'] += 1
+            metrics['last_tick_ms'] = tick_ms
+            if tick_ms > REFRESH_RATE * 1000:
+                metrics['overruns'] += 1
+
+        collectors_stop.wait(REFRESH_RATE)
+
+
+def start_collectors():
+    """Start one collection task per environment (only once per process)."""
+    global collectors_started
+    if collectors_started:
+        return
+    collectors_started = True
+    init_db()
+    socketio.start_background_task(warm_history_cache)
+    for env in get_available_environments():
+        socketio.start_background_task(collect_server_data, env)
+        print(f"Started collection task for environment: {env} ({ASYNC_MODE})")
+
+
+def stop_collectors():
+    """Ask the collection tasks to exit after their current tick."""
+    collectors_stop.set()
 
 
 @app.route('/')
@@ -762,20 +1331,55 @@ def index():
     )
 
 
+@app.route('/api/export/chart_data')
+def export_chart_data():
+    fmt = request.args.get('format', 'csv')
+    environment = request.args.get('environment', DEFAULT_ENV)
+    if fmt not in EXPORT_FORMATS:
+        return {'error': f"Invalid format: {fmt}", 'formats': list(EXPORT_FORMATS)}, 400
+    if environment not in get_available_environments():
+        return {'error': f"Invalid environment: {environment}"}, 400
+    if not os.path.exists(DATABASE):
+        return {'error': 'No chart data recorded yet'}, 404
+    try:
+        start = int(request.args['start']) if request.args.get('start') else None
+        end = int(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return {'error': 'start and end must be unix timestamps'}, 400
+
+    mimetype, exporter = EXPORT_FORMATS[fmt]
+    chunks = iter_chart_data(
+        environment,
+        chart_ids=request.args.getlist('chart_id'),
+        series_names=request.args.getlist('series_name'),
+        start=start,
+        end=end,
+    )
+    extension = 'bin' if fmt == 'columnar' else fmt
+    return Response(
+        stream_with_context(exporter(chunks)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=chart_data_{environment}.{extension}'},
+    )
+
+
 @socketio.on('connect')
 def handle_connect():
     sid = request.sid
-    client_environments[sid] = DEFAULT_ENV
+    with clients_lock:
+        client_environments[sid] = DEFAULT_ENV
+        client_states[sid] = _new_client_state()
     join_room(DEFAULT_ENV)
     print(f'SocketIO: Client {sid} connected → room {DEFAULT_ENV}')
-    if DEFAULT_ENV in server_data_cache:
-        emit('server_data_update', server_data_cache[DEFAULT_ENV])
+    # The first snapshot is sent once the client reports its state (client_state)
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     sid = request.sid
-    env = client_environments.pop(sid, None)
+    with clients_lock:
+        env = client_environments.pop(sid, None)
+        client_states.pop(sid, None)
     print(f'SocketIO: Client {sid} disconnected (was in {env})')
 
 
@@ -791,11 +1395,49 @@ def handle_change_environment(data):
     if old_env != environment:
         leave_room(old_env)
         join_room(environment)
+    with clients_lock:
         client_environments[sid] = environment
+        if sid in client_states:
+            client_states[sid].update(sent_seq=0, last_sent=0.0, awaiting_ack=False)
 
     emit('environment_changed', {'status': 'success', 'environment': environment})
-    if environment in server_data_cache:
-        emit('server_data_update', server_data_cache[environment])
+    push_server_data(environment, [sid])
+
+
+@socketio.on('snapshot_ack')
+def handle_snapshot_ack(data):
+    sid = request.sid
+    with clients_lock:
+        state = client_states.get(sid)
+        environment = client_environments.get(sid, DEFAULT_ENV)
+        # seq is per environment: a late ack for the previous environment's
+        # snapshot must not release the one sent after change_environment
+        if not state or data.get('environment') != environment or data.get('seq') != state['sent_seq']:
+            return
+        state['awaiting_ack'] = False
+    push_server_data(environment, [sid])
+
+
+@socketio.on('client_state')
+def handle_client_state(data):
+    sid = request.sid
+    with clients_lock:
+        state = client_states.get(sid)
+        if not state:
+            return
+        state['visible'] = bool(data.get('visible', True))
+        try:
+            state['min_interval'] = max(float(data.get('refresh_rate') or REFRESH_RATE), REFRESH_RATE)
+        except (TypeError, ValueError):
+            state['min_interval'] = REFRESH_RATE
+        environment = client_environments.get(sid, DEFAULT_ENV)
+    push_server_data(environment, [sid])
+
+
+@socketio.on('get_collector_status')
+def handle_get_collector_status():
+    environment = client_environments.get(request.sid, DEFAULT_ENV)
+    emit('collector_status', get_collector_status(environment))
 
 
 @socketio.on('get_historical_data')
@@ -806,21 +1448,25 @@ def handle_get_historical_data(data):
     max_points = data.get('max_points', 100)
     environment = client_environments.get(sid, DEFAULT_ENV)
 
-    rows = get_chart_data(chart_id, series_name, max_points, environment)
+    cached = get_cached_chart_data(chart_id, series_name, max_points, environment)
+    if cached:
+        times, values = cached
+    else:
+        rows = run_blocking(get_chart_data, chart_id, series_name, max_points, environment)
+
+        if not rows or not all(isinstance(row, (list, tuple)) and len(row) == 2 for row in rows):
+            rows = []
 
-    if not rows or not all(isinstance(row, (list, tuple)) and len(row) == 2 for row in rows):
-        emit('historical_data_response', {
-            'chart_id': chart_id,
-            'series_name': series_name,
-            'data': [],
-            'environment': environment
-        })
-        return
+        # Oldest first, as parallel arrays
+        rows.reverse()
+        times = [row[0] for row in rows]
+        values = [row[1] for row in rows]
 
     emit('historical_data_response', {
         'chart_id': chart_id,
         'series_name': series_name,
-        'data': [{'time': row[0], 'value': row[1]} for row in rows],
+        'times': times,
+        'values': values,
         'environment': environment
     })
 
@@ -834,15 +1480,12 @@ def handle_save_chart_config(data):
 
 
 if __name__ == '__main__':
-    for env in get_available_environments():
-        t = threading.Thread(target=collect_server_data, args=(env,), daemon=True)
-        t.start()
-        print(f"Started collection thread for environment: {env}")
+    start_collectors()
 
     socketio.run(
         app,
         debug=config['general']['debug'] == '1',
         host='0.0.0.0',
-        port=config['general']['port'],
+        port=int(config['general']['port']),
         allow_unsafe_werkzeug=True,
     )
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""Collector benchmark against local SSH, PostgreSQL and PGBouncer stand-ins.
+
+Starts the fakes from benchmarks/fakes.py, writes a config.ini with N linux
+hosts plus one postgres and one pgbouncer target into a work directory,
+imports app.py from there and measures:
+
+- collector tick latency and CPU time per host;
+- SQLite write throughput of save_chart_points, one collector tick's
+  points per transaction;
+- broadcast cost per connected Socket.IO client;
+- history query latency (get_chart_data, the in-memory history cache,
+  iter_chart_data) over chart_data;
+- collector ticks while several SSH hosts are unreachable and their failure
+  mails go to a slow SMTP server. The run aborts with a traceback if the
+  process stalls, so --async-mode gevent doubles as a regression check for
+  the notification locking.
+
+Results are printed as one JSON document (or written to --output).
+
+    pip install "python-socketio[client]"
+    python benchmarks/bench_collector.py --hosts 20 --clients 50 --output results.json
+    python benchmarks/bench_collector.py --async-mode gevent
+
+A multi-GB chart_data takes a while to build (~20M rows for 2 GB); keep it
+across runs with --workdir, existing rows are reused:
+
+    python benchmarks/bench_collector.py --workdir /var/tmp/nedara-bench --history-rows 20000000
+
+With --serve PORT it only writes config.ini for a dashboard on PORT into
+--workdir and keeps the stand-ins running, to load test a real server
+(benchmarks/loadtest.py) against reachable hosts:
+
+    python benchmarks/bench_collector.py --serve 5000 --hosts 10 --failing-hosts 0 --refresh-rate 1 --workdir /tmp/lt
+"""
+
+import argparse
+import faulthandler
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from contextlib import closing, redirect_stdout
+
+import fakes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENVIRONMENT = 'bench'
+FAILING_ENVIRONMENT = 'bench_failing'
+CLIENT_WEBSOCKET_OPTIONS = {'skip_utf8_validation': True}  # see loadtest.py
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def write_config(path, hosts, failing_hosts, refresh_rate, async_mode, ports, app_port=0):
+    servers = [f"host{i}" for i in range(hosts)] + ['pg', 'pgb']
+    failing = [f"down{i}" for i in range(failing_hosts)]
+    lines = [
+        "[general]", f"port = {app_port}", f"refresh_rate = {refresh_rate}", "chart_history = 5000", "debug = 0",
+        f"async_mode = {async_mode}", "secret_key = bench",
+        "email_notif_smtp_server = 127.0.0.1", f"email_notif_smtp_port = {ports['smtp']}",
+        "email_notif_login = bench@localhost", "email_notif_password = bench",
+        "email_notif_recipients = ops@localhost",
+        "[environments]", f"available_env = {ENVIRONMENT}, {FAILING_ENVIRONMENT}", f"default_env = {ENVIRONMENT}",
+        f"[{ENVIRONMENT}]", f"url = http://127.0.0.1:{ports['http']}/", "url_name = bench",
+        f"servers = {', '.join(servers)}",
+        f"[{FAILING_ENVIRONMENT}]", f"url = http://127.0.0.1:{ports['http']}/", "url_name = bench",
+        f"servers = {', '.join(failing)}",
+    ]
+    for i in range(hosts):
+        lines += [
+            f"[host{i}]", "type = linux", f"name = host{i}", "host = 127.0.0.1", f"port = {ports['ssh']}",
+            "user = bench", "password = bench", "log_file = /var/log/odoo/odoo.log",
+            "nginx_access_file = /var/log/nginx/access.log", f"chart_label = host{i}", "chart_color = #3b82f6",
+        ]
+    unreachable = closed_port()
+    for i in range(failing_hosts):
+        lines += [
+            f"[down{i}]", "type = linux", f"name = down{i}", "host = 127.0.0.1", f"port = {unreachable}",
+            "user = bench", "password = bench", f"chart_label = down{i}", "chart_color = #ef4444",
+        ]
+    lines += [
+        "[pg]", "type = postgres", "name = pg", "host = 127.0.0.1", f"port = {ports['postgres']}",
+        "user = bench", "password = bench", "database = mydb",
+        "[pgb]", "type = pgbouncer", "name = pgb", "host = 127.0.0.1", f"port = {ports['postgres']}",
+        "database = pgbouncer", "user = bench", "password = bench",
+    ]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return None
+    samples_ms = sorted(samples_ms)
+    return {
+        'count': len(samples_ms),
+        'p50_ms': round(statistics.median(samples_ms), 3),
+        'p95_ms': round(samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))], 3),
+        'max_ms': round(samples_ms[-1], 3),
+    }
+
+
+def run_collector(app, environment, ticks):
+    """Run an environment's collector loop for `ticks` ticks (after one warm-up
+    tick) and return the (cpu, wall) seconds they took."""
+    def ticks_done():
+        with app.metrics_lock:
+            return app.collector_metrics.get(environment, {}).get('ticks', 0)
+
+    app.collectors_stop.clear()
+    thread = threading.Thread(target=app.collect_server_data, args=(environment,), daemon=True)
+    thread.start()
+    while ticks_done() < 1:
+        time.sleep(0.005)
+    with app.metrics_lock:
+        app.collector_metrics.pop(environment)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    while ticks_done() < ticks:
+        time.sleep(0.005)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    app.stop_collectors()
+    thread.join()
+    return cpu, wall
+
+
+def bench_ticks(app, hosts, ticks):
+    cpu, wall = run_collector(app, ENVIRONMENT, ticks)
+    status = app.get_collector_status(ENVIRONMENT)
+    return {
+        'ticks': status['ticks'],
+        'overruns': status['overruns'],
+        'tick': status['timings']['collector']['tick'],
+        'cpu_seconds': round(cpu, 3),
+        'cpu_ms_per_tick': round(cpu / status['ticks'] * 1000, 3),
+        'cpu_ms_per_host_tick': round(cpu / status['ticks'] / (hosts + 2) * 1000, 3),
+        'wall_seconds': round(wall, 3),
+        'phases': {
+            target: phases for target, phases in status['timings'].items()
+            if target in ('collector', 'host0', 'pg', 'pgb', 'web')
+        },
+        'errors': status['errors'],
+    }
+
+
+def bench_failures(app, failing_hosts, ticks, timeout):
+    # Blocking the process (e.g. a flock held across a gevent switch) stops
+    # every greenlet, including this one; faulthandler's watchdog thread
+    # still fires and exits with the stuck stacks.
+    faulthandler.dump_traceback_later(timeout, exit=True)
+    try:
+        _, wall = run_collector(app, FAILING_ENVIRONMENT, ticks)
+    finally:
+        faulthandler.cancel_dump_traceback_later()
+    status = app.get_collector_status(FAILING_ENVIRONMENT)
+    return {
+        'failing_hosts': failing_hosts,
+        'ticks': status['ticks'],
+        'tick': status['timings']['collector']['tick'],
+        'wall_seconds': round(wall, 3),
+    }
+
+
+def bench_sqlite_writes(app, writes, hosts):
+    # Same batches as a collector tick: 6 chart points per linux host
+    timestamp = int(time.time()) + 10 ** 6  # clear of the collector's own rows
+    charts = ('CPUChart', 'httpRequestsChart', 'RAMChart', 'LoadAvgChart', 'NetworkChart', 'DiskIOChart')
+    batches = max(1, writes // (len(charts) * hosts))
+    samples = []
+    start = time.perf_counter()
+    for i in range(batches):
+        points = [
+            (chart, f"bench-writes{h}", timestamp + i, random.random() * 100)
+            for h in range(hosts) for chart in charts
+        ]
+        batch_start = time.perf_counter()
+        app.save_chart_points(points, ENVIRONMENT)
+        samples.append((time.perf_counter() - batch_start) * 1000)
+    elapsed = time.perf_counter() - start
+    written = batches * len(charts) * hosts
+    return {
+        'writes': written,
+        'points_per_tick': len(charts) * hosts,
+        'seconds': round(elapsed, 3),
+        'writes_per_second': round(written / elapsed, 1),
+        'tick_write': percentiles(samples),
+    }
+
+
+def bench_broadcast(app, clients, rounds):
+    if app.ASYNC_MODE == 'gevent':
+        # The threaded Socket.IO client can't share a monkey-patched process
+        return {'skipped': 'not available with --async-mode gevent, use benchmarks/loadtest.py'}
+    try:
+        import socketio
+        socketio.Client()  # fails early without websocket-client
+    except Exception as e:
+        return {'skipped': f"python-socketio[client] is required: {e}"}
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    logging.getLogger('werkzeug').setLevel(logging.CRITICAL)  # websocket teardown noise
+    threading.Thread(
+        target=app.socketio.run, args=(app.app,),
+        kwargs={'host': '127.0.0.1', 'port': port, 'allow_unsafe_werkzeug': True, 'log_output': False},
+        daemon=True,
+    ).start()
+    time.sleep(0.5)
+
+    received = {}
+    cond = threading.Condition()
+    viewers = []
+
+    def make_viewer(i):
+        client = socketio.Client(reconnection=False, websocket_extra_options=CLIENT_WEBSOCKET_OPTIONS)
+
+        @client.on('server_data_update')
+        def on_update(data):
+            with cond:
+                received[i] = data['seq']
+                cond.notify_all()
+            client.emit('snapshot_ack', {'seq': data['seq'], 'environment': data['environment']})
+
+        client.connect(f"http://127.0.0.1:{port}", transports=['websocket'])
+        client.emit('client_state', {'visible': True, 'refresh_rate': None})
+        return client
+
+    try:
+        for i in range(clients):
+            viewers.append(make_viewer(i))
+        time.sleep(0.5)
+
+        emit_ms, delivered_ms = [], []
+        snapshot = dict(app.server_data_cache[ENVIRONMENT])
+        for _ in range(rounds):
+            time.sleep(app.REFRESH_RATE)
+            snapshot = dict(snapshot, seq=snapshot['seq'] + 1, generated_at=time.time())
+            app.server_data_cache[ENVIRONMENT] = snapshot
+            start = time.perf_counter()
+            app.push_server_data(ENVIRONMENT)
+            emit_ms.append((time.perf_counter() - start) * 1000)
+            with cond:
+                cond.wait_for(
+                    lambda: sum(1 for seq in received.values() if seq >= snapshot['seq']) == clients, timeout=10,
+                )
+            delivered_ms.append((time.perf_counter() - start) * 1000)
+    finally:
+        for viewer in viewers:
+            viewer.disconnect()
+
+    return {
+        'clients': clients,
+        'payload_bytes': len(json.dumps(snapshot, cls=app.CustomJSONEncoder)),
+        'emit': percentiles(emit_ms),
+        'delivered_to_all': percentiles(delivered_ms),
+        'emit_ms_per_client': round(statistics.median(emit_ms) / clients, 4),
+    }
+
+
+def fill_history(app, rows, hosts):
+    """Bulk-insert synthetic chart_data up to `rows` rows (existing rows count)."""
+    with closing(app.connect_db()) as db:
+        existing = db.execute("SELECT COUNT(*) FROM chart_data").fetchone()[0]
+        missing = rows - existing
+        if missing <= 0:
+            return existing, 0.0
+        series = [(chart, f"host{i}") for chart in app.HISTORY_CHARTS for i in range(hosts)]
+        per_series = missing // len(series) + 1
+        first = int(time.time()) - 10 ** 8 - per_series  # before any collected or benchmarked row
+        start = time.perf_counter()
+        for chart, label in series:
+            db.executemany(
+                "INSERT OR IGNORE INTO chart_data (chart_id, series_name, timestamp, value, environment) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((chart, label, first + t, (t % 1000) / 10, ENVIRONMENT) for t in range(per_series)),
+            )
+            db.commit()
+        total = db.execute("SELECT COUNT(*) FROM chart_data").fetchone()[0]
+        return total, time.perf_counter() - start
+
+
+def bench_history(app, rows, hosts, queries):
+    total, fill_seconds = fill_history(app, rows, hosts)
+    db_bytes = os.path.getsize(app.DATABASE)
+
+    latest, cached = [], []
+    for _ in range(queries):
+        chart, label = random.choice(app.HISTORY_CHARTS), f"host{random.randrange(hosts)}"
+        start = time.perf_counter()
+        app.get_chart_data(chart, label, 5000, ENVIRONMENT)
+        latest.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    app.warm_history_cache()
+    warm_seconds = time.perf_counter() - start
+    for _ in range(queries):
+        chart, label = random.choice(app.HISTORY_CHARTS), f"host{random.randrange(hosts)}"
+        start = time.perf_counter()
+        app.get_cached_chart_data(chart, label, min(5000, app.HISTORY_CACHE_POINTS), ENVIRONMENT)
+        cached.append((time.perf_counter() - start) * 1000)
+
+    start, exported = time.perf_counter(), 0
+    for chunk in app.iter_chart_data(ENVIRONMENT, chart_ids=['CPUChart'], series_names=['host0']):
+        exported += len(chunk)
+    export_seconds = time.perf_counter() - start
+
+    return {
+        'rows': total,
+        'db_bytes': db_bytes,
+        'fill_seconds': round(fill_seconds, 3),
+        'get_chart_data_5000': percentiles(latest),
+        'cache_warm_seconds': round(warm_seconds, 3),
+        'cached_chart_data_5000': percentiles(cached),
+        'export_series': {
+            'rows': exported,
+            'seconds': round(export_seconds, 3),
+            'rows_per_second': round(exported / export_seconds, 1) if export_seconds else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=10, help='simulated linux hosts')
+    parser.add_argument('--ticks', type=int, default=20, help='collector ticks to measure')
+    parser.add_argument('--refresh-rate', type=float, default=0.05, help='collector refresh rate (seconds)')
+    parser.add_argument('--writes', type=int, default=2000, help='chart points to write, in per-tick batches')
+    parser.add_argument('--clients', type=int, default=20, help='Socket.IO clients for the broadcast test')
+    parser.add_argument('--rounds', type=int, default=50, help='broadcast rounds')
+    parser.add_argument('--history-rows', type=int, default=1_000_000, help='chart_data rows for history queries')
+    parser.add_argument('--queries', type=int, default=50, help='history queries to time')
+    parser.add_argument('--failing-hosts', type=int, default=4, help='unreachable hosts for the failure test')
+    parser.add_argument('--failure-ticks', type=int, default=3, help='collector ticks to run with failing hosts')
+    parser.add_argument('--failure-timeout', type=float, default=120, help='abort if the failure test stalls this long')
+    parser.add_argument('--async-mode', choices=('threading', 'gevent'), default='threading')
+    parser.add_argument('--workdir', help='directory for config.ini and the database (default: temporary)')
+    parser.add_argument('--output', help='write results to this file instead of stdout')
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help='only write config.ini for a dashboard on PORT and keep the stand-ins running')
+    args = parser.parse_args()
+
+    ports_queue = multiprocessing.Queue()
+    stand_ins = multiprocessing.Process(target=fakes.serve, args=(ports_queue,), daemon=True)
+    stand_ins.start()
+    ports = ports_queue.get(timeout=60)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='nedara-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    write_config(
+        os.path.join(workdir, 'config.ini'), args.hosts, args.failing_hosts, args.refresh_rate, args.async_mode, ports,
+        args.serve or 0,
+    )
+    if args.serve:
+        print(f"Stand-ins running, start the dashboard from {workdir} (Ctrl-C to stop)")
+        try:
+            stand_ins.join()
+        except KeyboardInterrupt:
+            stand_ins.terminate()
+        return
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    import app  # reads config.ini from the working directory (and monkey-patches for gevent)
+
+    app.init_db()
+    try:
+        with redirect_stdout(sys.stderr):  # keep the app's own prints out of the results
+            results = {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': sys.version.split()[0],
+                'cpu_count': os.cpu_count(),
+                'hosts': args.hosts,
+                'refresh_rate': args.refresh_rate,
+                'async_mode': app.ASYNC_MODE,
+                'ticks': bench_ticks(app, args.hosts, args.ticks),
+                'failures': bench_failures(app, args.failing_hosts, args.failure_ticks, args.failure_timeout),
+                'sqlite_writes': bench_sqlite_writes(app, args.writes, args.hosts),
+                'broadcast': bench_broadcast(app, args.clients, args.rounds),
+                'history': bench_history(app, args.history_rows, args.hosts, args.queries),
+            }
+    finally:
+        stand_ins.terminate()
+
+    output = json.dumps(results, indent=2, cls=app.CustomJSONEncoder)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
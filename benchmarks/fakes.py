@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""Local stand-ins for the monitored infrastructure, used by the benchmarks.
+
+- an SSH server (paramiko) answering the collector's commands with canned
+  /proc, top, free, df and ps output;
+- a PostgreSQL wire-protocol server answering the pg_stat_activity /
+  pg_database queries and the PGBouncer SHOW POOLS / STATS / CONFIG commands;
+- an HTTP server answering 200 for the web health check;
+- a slow SMTP server for the failure-notification path.
+
+serve() runs all of them in the current process and reports their ports.
+"""
+
+import http.server
+import itertools
+import logging
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import paramiko
+
+ACTIVITY_ROWS = 50
+PROCESS_ROWS = 19
+LOG_LINES = 500
+
+_counter = itertools.count()
+
+
+# ——————————————————————————————————————————
+# SSH
+# ——————————————————————————————————————————
+
+def canned_output(command):
+    tick = next(_counter)
+    if 'top -bn1' in command:
+        return f"{12.5 + tick % 40}\n"
+    if 'free -m' in command:
+        return "15890 6123 9100\n"
+    if 'df -B1' in command:
+        return "105089261568 42035704627 57672318976\n"
+    if 'tail -n' in command:
+        return ''.join(
+            f"2025-01-01 12:00:{i % 60:02d},000 {i} INFO db odoo.modules: line {i}\n" for i in range(LOG_LINES)
+        )
+    if '/proc/loadavg' in command:
+        return "0.52\n"
+    if '/proc/net/dev' in command:
+        return f"{tick * 125_000} {tick * 62_500}\n"
+    if '/proc/diskstats' in command:
+        return f"{tick * 4096 * 512} {tick * 8192 * 512}\n"
+    if 'ps aux' in command:
+        rows = [f"www-data {1000 + i} {50 - i * 2.5:.1f} {1.2 + i * 0.1:.1f} /usr/bin/python3" for i in range(PROCESS_ROWS)]
+        return "USER PID %CPU %MEM COMMAND\n" + '\n'.join(rows) + '\n'
+    # nginx access-log awk counter
+    return "42\n"
+
+
+class _SSHServer(paramiko.ServerInterface):
+    def __init__(self):
+        self.commands = {}
+        self.lock = threading.Lock()
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        with self.lock:
+            self.commands[channel.get_id()] = command.decode()
+        return True
+
+
+def _reply(server, channel):
+    # The exec request is acknowledged after check_channel_exec_request
+    # returns, so wait for it before writing the output.
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with server.lock:
+            command = server.commands.pop(channel.get_id(), None)
+        if command is not None:
+            break
+        time.sleep(0.001)
+    try:
+        if command is not None:
+            channel.sendall(canned_output(command).encode())
+            channel.send_exit_status(0)
+    finally:
+        channel.close()
+
+
+def serve_ssh(sock, host_key):
+    def handle(conn):
+        server = _SSHServer()
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(host_key)
+        transport.start_server(server=server)
+        while transport.is_active():
+            channel = transport.accept(timeout=1)
+            if channel is not None:
+                threading.Thread(target=_reply, args=(server, channel), daemon=True).start()
+
+    while True:
+        conn, _ = sock.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+# ——————————————————————————————————————————
+# PostgreSQL / PGBouncer (wire protocol v3, trust auth, text results)
+# ——————————————————————————————————————————
+
+TEXT, INT8, FLOAT8, NUMERIC = 25, 20, 701, 1700
+
+
+def _msg(kind, payload=b''):
+    return kind + struct.pack('!I', len(payload) + 4) + payload
+
+
+def _cstr(value):
+    return value.encode() + b'\0'
+
+
+def result_for(query):
+    """Return (columns, rows, tag) for a query; columns are (name, type oid)."""
+    q = query.strip().rstrip(';').upper()
+    if 'PG_STAT_ACTIVITY' in q:
+        columns = [('datname', TEXT), ('usename', TEXT), ('state', TEXT), ('query', TEXT),
+                   ('wait_event_type', TEXT), ('wait_event', TEXT), ('wait_time_seconds', NUMERIC)]
+        rows = [
+            ('mydb', 'odoo', 'active' if i % 3 else 'idle in transaction',
+             f"SELECT id FROM res_partner WHERE id = {i}", 'Client', 'ClientRead', f"{i * 0.37:.6f}")
+            for i in range(ACTIVITY_ROWS)
+        ]
+        return columns, rows, f"SELECT {len(rows)}"
+    if 'PG_DATABASE_SIZE' in q:
+        return [('pg_database_size', INT8)], [('8589934592',)], "SELECT 1"
+    if 'FROM PG_DATABASE' in q:
+        rows = [(f"db{i}",) for i in range(5)]
+        return [('datname', TEXT)], rows, f"SELECT {len(rows)}"
+    if q == 'SHOW POOLS':
+        columns = [(name, TEXT) for name in ('database', 'user')] + \
+                  [(name, INT8) for name in ('cl_active', 'cl_waiting', 'sv_active', 'sv_idle', 'sv_used', 'maxwait')] + \
+                  [('pool_mode', TEXT)]
+        rows = [(f"db{i}", 'odoo', '12', str(i % 2), '8', '4', '2', '0', 'transaction') for i in range(5)]
+        return columns, rows, "SHOW"
+    if q == 'SHOW STATS':
+        columns = [('database', TEXT)] + [(name, INT8) for name in ('avg_query_count', 'avg_query_time', 'avg_wait_time')]
+        rows = [(f"db{i}", '150', '2300', '120') for i in range(5)] + [('pgbouncer', '1', '0', '0')]
+        return columns, rows, "SHOW"
+    if q == 'SHOW CONFIG':
+        columns = [('key', TEXT), ('value', TEXT), ('default', TEXT), ('changeable', TEXT)]
+        rows = [('max_client_conn', '1000', '100', 'yes'), ('default_pool_size', '20', '20', 'yes')]
+        return columns, rows, "SHOW"
+    return None, [], q.split(' ')[0] if q else 'EMPTY'
+
+
+def _row_description(columns):
+    payload = struct.pack('!H', len(columns))
+    for name, oid in columns:
+        typlen = 8 if oid in (INT8, FLOAT8) else -1
+        payload += _cstr(name) + struct.pack('!IhIhih', 0, 0, oid, typlen, -1, 0)
+    return _msg(b'T', payload)
+
+
+def _data_rows(rows):
+    out = []
+    for row in rows:
+        payload = struct.pack('!H', len(row))
+        for value in row:
+            data = value.encode()
+            payload += struct.pack('!i', len(data)) + data
+        out.append(_msg(b'D', payload))
+    return b''.join(out)
+
+
+def _recv_exact(conn, size):
+    buf = b''
+    while len(buf) < size:
+        chunk = conn.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError
+        buf += chunk
+    return buf
+
+
+def _handle_postgres(conn):
+    with conn:
+        # Startup, possibly preceded by SSL / GSS encryption requests
+        while True:
+            length, code = struct.unpack('!II', _recv_exact(conn, 8))
+            _recv_exact(conn, length - 8)
+            if code in (80877103, 80877104):
+                conn.sendall(b'N')
+                continue
+            break
+
+        params = {'server_version': '16.0', 'server_encoding': 'UTF8', 'client_encoding': 'UTF8',
+                  'DateStyle': 'ISO, MDY', 'integer_datetimes': 'on', 'standard_conforming_strings': 'on',
+                  'TimeZone': 'UTC'}
+        conn.sendall(
+            _msg(b'R', struct.pack('!I', 0))
+            + b''.join(_msg(b'S', _cstr(k) + _cstr(v)) for k, v in params.items())
+            + _msg(b'K', struct.pack('!II', 1, 1))
+            + _msg(b'Z', b'I')
+        )
+
+        status, query = b'I', ''
+        while True:
+            kind = _recv_exact(conn, 1)
+            (length,) = struct.unpack('!I', _recv_exact(conn, 4))
+            body = _recv_exact(conn, length - 4)
+
+            if kind == b'X':
+                return
+            if kind == b'Q':
+                query = body.rstrip(b'\0').decode()
+                columns, rows, tag = result_for(query)
+                if tag == 'BEGIN':
+                    status = b'T'
+                elif tag in ('COMMIT', 'ROLLBACK'):
+                    status = b'I'
+                out = (_row_description(columns) + _data_rows(rows)) if columns else b''
+                conn.sendall(out + _msg(b'C', _cstr(tag)) + _msg(b'Z', status))
+            elif kind == b'P':
+                query = body.split(b'\0')[1].decode()
+                conn.sendall(_msg(b'1'))
+            elif kind == b'B':
+                conn.sendall(_msg(b'2'))
+            elif kind == b'D':
+                columns, _, _ = result_for(query)
+                out = _msg(b't', struct.pack('!H', 0)) if body[:1] == b'S' else b''
+                conn.sendall(out + (_row_description(columns) if columns else _msg(b'n')))
+            elif kind == b'E':
+                columns, rows, tag = result_for(query)
+                conn.sendall(_data_rows(rows) + _msg(b'C', _cstr(tag)))
+            elif kind == b'S':
+                conn.sendall(_msg(b'Z', status))
+
+
+def serve_postgres(sock):
+    while True:
+        conn, _ = sock.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=_handle_postgres, args=(conn,), daemon=True).start()
+
+
+# ——————————————————————————————————————————
+# HTTP
+# ——————————————————————————————————————————
+
+class _HealthHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'OK')
+
+    def log_message(self, *args):
+        pass
+
+
+# ——————————————————————————————————————————
+# SMTP
+# ——————————————————————————————————————————
+
+SMTP_DELAY = 0.2  # seconds before each reply, so senders block mid-conversation
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib to connect and EHLO; STARTTLS is not
+    # advertised, so send_notification_mail gives up after the greeting.
+    def reply(self, line):
+        time.sleep(SMTP_DELAY)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 fake ESMTP')
+        for line in self.rfile:
+            verb = line.split(b' ', 1)[0].strip().upper()
+            if verb == b'EHLO':
+                self.reply('250 fake')
+            elif verb == b'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+
+def _listen():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(256)
+    return sock
+
+
+def serve(ports_queue):
+    """Run the SSH, PostgreSQL and HTTP stand-ins forever, reporting their ports."""
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)  # clients hang up mid-transport
+    host_key = paramiko.RSAKey.generate(2048)
+    ssh_sock, pg_sock = _listen(), _listen()
+    httpd = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _HealthHandler)
+    httpd.daemon_threads = True
+    smtpd = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SMTPHandler)
+    smtpd.daemon_threads = True
+
+    threading.Thread(target=serve_ssh, args=(ssh_sock, host_key), daemon=True).start()
+    threading.Thread(target=serve_postgres, args=(pg_sock,), daemon=True).start()
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    threading.Thread(target=smtpd.serve_forever, daemon=True).start()
+
+    ports_queue.put({
+        'ssh': ssh_sock.getsockname()[1],
+        'postgres': pg_sock.getsockname()[1],
+        'http': httpd.server_address[1],
+        'smtp': smtpd.server_address[1],
+    })
+    while True:
+        time.sleep(3600)
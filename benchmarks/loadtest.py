@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Socket.IO load test for the dashboard broadcast path.
+
+Connects simulated dashboard viewers to a running server in steps and, for
+each step, reports the connection count, the server's resident memory and
+the broadcast latency (snapshot generation to receipt) as one JSON line.
+
+    pip install "python-socketio[client]"
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --pid <server pid> --steps 50,100,200
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import socketio
+
+# websocket-client validates UTF-8 in pure Python, ~200 ms of CPU per
+# snapshot with a few hosts' logs in it: the viewers would measure themselves
+CLIENT_WEBSOCKET_OPTIONS = {'skip_utf8_validation': True}
+
+
+class Viewer:
+    def __init__(self, url, latencies, lock):
+        self.client = socketio.Client(reconnection=False, websocket_extra_options=CLIENT_WEBSOCKET_OPTIONS)
+        self.latencies = latencies
+        self.lock = lock
+        self.client.on('server_data_update', self.on_update)
+        self.client.connect(url, transports=['websocket'])
+        self.client.emit('client_state', {'visible': True, 'refresh_rate': None})
+
+    def on_update(self, data):
+        latency = time.time() - data.get('generated_at', time.time())
+        with self.lock:
+            self.latencies.append(latency)
+        try:
+            self.client.emit('snapshot_ack', {'seq': data.get('seq'), 'environment': data.get('environment')})
+        except socketio.exceptions.BadNamespaceError:
+            pass  # disconnecting
+
+    def close(self):
+        self.client.disconnect()
+
+
+def server_rss_mb(pid):
+    if not pid:
+        return None
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--pid', type=int, help='server process id, to sample its RSS')
+    parser.add_argument('--steps', default='10,50,100,200', help='comma-separated connection counts')
+    parser.add_argument('--settle', type=float, default=3.0, help='seconds to wait after connecting')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to sample each step')
+    args = parser.parse_args()
+
+    latencies, lock = [], threading.Lock()
+    viewers = []
+    try:
+        for target in (int(s) for s in args.steps.split(',')):
+            started = time.perf_counter()
+            while len(viewers) < target:
+                viewers.append(Viewer(args.url, latencies, lock))
+            connect_time = time.perf_counter() - started
+            time.sleep(args.settle)
+
+            with lock:
+                latencies.clear()
+            time.sleep(args.duration)
+            with lock:
+                sample = list(latencies)
+
+            print(json.dumps({
+                'connections': len(viewers),
+                'connect_seconds': round(connect_time, 3),
+                'server_rss_mb': server_rss_mb(args.pid),
+                'updates_per_second': round(len(sample) / args.duration, 2),
+                'latency_p50_ms': round(statistics.median(sample) * 1000, 2) if sample else None,
+                'latency_p95_ms': round(percentile(sample, 95) * 1000, 2) if sample else None,
+                'latency_max_ms': round(max(sample) * 1000, 2) if sample else None,
+            }), flush=True)
+    finally:
+        for viewer in viewers:
+            viewer.close()
+
+
+if __name__ == '__main__':
+    main()
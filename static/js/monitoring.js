@@ -4,6 +4,55 @@ import Nedara from "../js/lib/nedarajs/nedara.min.js";
 
 const TEMPLATES = "/static/html/templates.html";
 
+// Live points queued per series before falling back to a full setData()
+const MAX_PENDING_POINTS = 60;
+// Rendered series may overshoot maxPoints by this factor before being trimmed
+const CHART_TRIM_SLACK   = 1.1;
+// Ask the server for slower updates when rendering takes more than this share of the interval
+const RENDER_BUDGET      = 0.25;
+
+// Fixed-capacity ring buffer of (time, value) points backed by typed arrays
+class SeriesBuffer {
+    constructor(capacity) {
+        this.capacity = Math.max(1, capacity);
+        this.times    = new Float64Array(this.capacity);
+        this.values   = new Float64Array(this.capacity);
+        this.head     = 0;
+        this.length   = 0;
+    }
+
+    lastTime() {
+        if (!this.length) return -Infinity;
+        return this.times[(this.head + this.length - 1) % this.capacity];
+    }
+
+    // Appends a point, bumping its time to keep timestamps strictly increasing
+    push(time, value) {
+        const last = this.lastTime();
+        if (time <= last) time = last + 1;
+        const idx = (this.head + this.length) % this.capacity;
+        this.times[idx]  = time;
+        this.values[idx] = value;
+        if (this.length < this.capacity) this.length++;
+        else this.head = (this.head + 1) % this.capacity;
+        return time;
+    }
+
+    forEach(fn) {
+        for (let i = 0; i < this.length; i++) {
+            const idx = (this.head + i) % this.capacity;
+            fn(this.times[idx], this.values[idx]);
+        }
+    }
+
+    toData() {
+        const out = new Array(this.length);
+        let i = 0;
+        this.forEach((time, value) => { out[i++] = { time, value }; });
+        return out;
+    }
+}
+
 const Monitoring = Nedara.createWidget({
     selector: "#monitoring",
     events: {
@@ -18,6 +67,7 @@ const Monitoring = Nedara.createWidget({
         'change #server-selector':       '_onServerSelectorChange',
         'click #refresh-interface':      '_onRefreshInterfaceBtnClick',
         'click #theme-toggle':           '_onThemeToggleClick',
+        'click #collector-status-btn':   '_onCollectorStatusClick',
     },
 
     start: async function () {
@@ -32,6 +82,14 @@ const Monitoring = Nedara.createWidget({
         this.serverLogs     = {};
         this.openLogSource  = null;
         this.charts         = null;
+        this.chartVisibility = {};
+        this._dirtyCharts    = new Set();
+        this._flushScheduled = false;
+        this._chartObserver  = null;
+        this.refreshRate     = null;
+        this._renderTimeMs   = 0;
+        this._pendingAck     = null;
+        this._hiddenSince    = null;
 
         this._loadingTimeout = setTimeout(() => this._showDashboard(), 15000);
 
@@ -44,12 +102,25 @@ const Monitoring = Nedara.createWidget({
             }
         });
 
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) {
+                this._hiddenSince = Date.now();
+            } else {
+                // Snapshots are not sent while hidden: reload chart history after a long absence
+                if (this._hiddenSince && Date.now() - this._hiddenSince > 60 * 1000) this.resetCharts();
+                this._hiddenSince = null;
+                this._scheduleChartFlush();
+            }
+            this.reportClientState();
+        });
+
         this.render();
         this.setupSocketListeners();
         this.autoReload();
 
         const self = this;
         this.socket.on('connect', function () {
+            self.reportClientState();
             const savedEnv = localStorage.getItem('nedara-env');
             if (savedEnv) {
                 self.socket.emit('change_environment', { environment: savedEnv });
@@ -79,25 +150,49 @@ const Monitoring = Nedara.createWidget({
         const self = this;
 
         this.socket.on('server_data_update', function (data) {
+            const started = performance.now();
             self.handleServerDataUpdate(data);
+            const update = {
+                seq: data.seq,
+                environment: data.environment,
+                baseRate: parseFloat(data.widget_config.refresh_rate),
+                elapsedMs: performance.now() - started,
+            };
+            if (self._flushScheduled) {
+                // Acknowledge once the charts are drawn, so an ack means this client caught up
+                self._pendingAck = update;
+            } else {
+                self._ackSnapshot(update);
+            }
         });
 
         this.socket.on('historical_data_response', function (data) {
-            if (!data.data || !data.data.length) return;
+            const times  = data.times  || [];
+            const values = data.values || [];
+            if (!times.length) return;
 
-            const formatted = data.data
-                .map(item => ({ time: Math.floor(item.time), value: parseFloat(item.value) }))
-                .filter(item => Number.isInteger(item.time) && !isNaN(item.value))
-                .sort((a, b) => a.time - b.time);
-
-            const unique = self.ensureUniqueTimestamps(formatted);
+            const conf       = self.charts?.find(c => c.id === data.chart_id);
             const seriesInfo = self.chartsInfoMap[data.chart_id]
                 ?.find(i => i.label === data.series_name);
-            if (seriesInfo) {
-                self.seriesData[data.chart_id][data.series_name] = unique;
-                seriesInfo.series.setData(unique);
-                self[data.chart_id].timeScale().fitContent();
+            if (!conf || !seriesInfo) return;
+
+            // History arrives oldest first; keep live points received meanwhile
+            const buffer = new SeriesBuffer(conf.maxPoints);
+            for (let i = 0; i < times.length; i++) {
+                const time  = Math.floor(times[i]);
+                const value = parseFloat(values[i]);
+                if (Number.isInteger(time) && !isNaN(value)) buffer.push(time, value);
+            }
+            const live = self.seriesData[data.chart_id][data.series_name];
+            if (live) {
+                const lastHistorical = buffer.lastTime();
+                live.forEach((time, value) => { if (time > lastHistorical) buffer.push(time, value); });
             }
+
+            self.seriesData[data.chart_id][data.series_name] = buffer;
+            seriesInfo.needsReset = true;
+            seriesInfo.pending    = [];
+            self._markChartDirty(data.chart_id);
         });
 
         this.socket.on('environment_changed', function (data) {
@@ -113,15 +208,48 @@ const Monitoring = Nedara.createWidget({
             }
         });
 
+        this.socket.on('collector_status', function (data) {
+            self.renderCollectorStatus(data);
+        });
+
         this.socket.on('connect_error', err => console.error('Socket error:', err));
     },
 
+    reportClientState: function () {
+        this.socket.emit('client_state', {
+            visible: !document.hidden,
+            refresh_rate: this.refreshRate,
+        });
+    },
+
+    _ackSnapshot: function (update) {
+        this._adaptRefreshRate(update.elapsedMs, update.baseRate);
+        this.socket.emit('snapshot_ack', { seq: update.seq, environment: update.environment });
+    },
+
+    // Tracks render cost (update handling plus the chart redraw it triggers)
+    // and asks the server to slow down when updates can't keep up
+    _adaptRefreshRate: function (elapsedMs, baseRate) {
+        if (!baseRate) return;
+        this._renderTimeMs = this._renderTimeMs ? 0.8 * this._renderTimeMs + 0.2 * elapsedMs : elapsedMs;
+        const needed = Math.ceil(this._renderTimeMs / RENDER_BUDGET / 1000);
+        const rate   = needed > baseRate ? needed : null;
+        if (rate !== this.refreshRate) {
+            this.refreshRate = rate;
+            this.reportClientState();
+        }
+    },
+
     // ——————————————————————————————————————————
     // CHART MANAGEMENT
     // ——————————————————————————————————————————
 
     resetCharts: function () {
         if (!this.charts) return;
+        if (this._chartObserver) this._chartObserver.disconnect();
+        this._chartObserver  = null;
+        this.chartVisibility = {};
+        this._dirtyCharts.clear();
         this.charts.forEach(conf => {
             if (this[conf.id] && this[conf.id].remove) {
                 this[conf.id].remove();
@@ -178,14 +306,8 @@ const Monitoring = Nedara.createWidget({
             pauseBtn.textContent = chart.isPaused ? '⏭ Resume' : '⏸ Pause';
             if (!chart.isPaused) {
                 const chartId = containerId.replace('Container', '');
-                const conf = this.charts.find(c => c.id === chartId);
-                _.each(this.chartsInfoMap[chartId], si => {
-                    const d = this.ensureUniqueTimestamps(
-                        (this.seriesData[chartId][si.label] || []).slice(-conf.maxPoints)
-                    );
-                    si.series.setData(d);
-                });
-                chart.timeScale().fitContent();
+                _.each(this.chartsInfoMap[chartId], si => { si.needsReset = true; });
+                this._markChartDirty(chartId);
             }
         });
 
@@ -224,6 +346,76 @@ const Monitoring = Nedara.createWidget({
         });
     },
 
+    observeChartVisibility: function (el) {
+        if (!window.IntersectionObserver) return;
+        if (!this._chartObserver) {
+            this._chartObserver = new IntersectionObserver(entries => {
+                entries.forEach(entry => {
+                    this.chartVisibility[entry.target.id] = entry.isIntersecting;
+                    if (entry.isIntersecting && this._dirtyCharts.has(entry.target.id)) {
+                        this._scheduleChartFlush();
+                    }
+                });
+            });
+        }
+        this._chartObserver.observe(el);
+    },
+
+    _markChartDirty: function (chartId) {
+        this._dirtyCharts.add(chartId);
+        this._scheduleChartFlush();
+    },
+
+    _scheduleChartFlush: function () {
+        if (this._flushScheduled || document.hidden || !this._dirtyCharts.size) return;
+        this._flushScheduled = true;
+        requestAnimationFrame(() => {
+            this._flushScheduled = false;
+            const started = performance.now();
+            this._flushCharts();
+            if (this._pendingAck) {
+                const update = this._pendingAck;
+                this._pendingAck = null;
+                update.elapsedMs += performance.now() - started;
+                this._ackSnapshot(update);
+            }
+        });
+    },
+
+    // Single redraw pass for all charts updated since the last animation frame.
+    // Paused, off-screen and background-tab charts stay dirty until shown again.
+    _flushCharts: function () {
+        if (!this.charts || document.hidden) return;
+        _.each(this.charts, conf => {
+            const chart = this[conf.id];
+            if (!this._dirtyCharts.has(conf.id) || !chart) return;
+            if (chart.isPaused || this.chartVisibility[conf.id] === false) return;
+            this._dirtyCharts.delete(conf.id);
+
+            _.each(this.chartsInfoMap[conf.id], si => {
+                const buffer = this.seriesData[conf.id][si.label];
+                if (!buffer) return;
+                if (si.needsReset || si.renderedCount + si.pending.length > conf.maxPoints * CHART_TRIM_SLACK) {
+                    si.series.setData(buffer.toData());
+                    si.renderedCount = buffer.length;
+                } else {
+                    si.pending.forEach(p => si.series.update(p));
+                    si.renderedCount += si.pending.length;
+                }
+                si.pending    = [];
+                si.needsReset = false;
+            });
+
+            const inner = document.getElementById(conf.container);
+            if (inner && (inner.clientWidth !== conf.width || inner.clientHeight !== conf.height)) {
+                conf.width  = inner.clientWidth;
+                conf.height = inner.clientHeight;
+                chart.resize(conf.width, conf.height);
+            }
+            chart.timeScale().fitContent();
+        });
+    },
+
     loadHistoricalData: function (chartId, seriesName, maxPoints) {
         this.socket.emit('get_historical_data', {
             chart_id: chartId, series_name: seriesName,
@@ -243,13 +435,14 @@ const Monitoring = Nedara.createWidget({
         // Init charts on first update (or after env reset)
         if (!this.charts) {
             this.chartAdaptiveDisplay = wc.chart_adaptive_display;
+            const maxPoints = parseInt(wc.chart_history, 10) || 5000;
             this.charts = [
-                { id: 'CPUChart',          container: 'CPUChartContainer',          maxPoints: wc.chart_history },
-                { id: 'httpRequestsChart', container: 'httpRequestsChartContainer', maxPoints: wc.chart_history },
-                { id: 'RAMChart',          container: 'RAMChartContainer',          maxPoints: wc.chart_history },
-                { id: 'LoadAvgChart',      container: 'LoadAvgChartContainer',      maxPoints: wc.chart_history },
-                { id: 'NetworkChart',      container: 'NetworkChartContainer',      maxPoints: wc.chart_history },
-                { id: 'DiskIOChart',       container: 'DiskIOChartContainer',       maxPoints: wc.chart_history },
+                { id: 'CPUChart',          container: 'CPUChartContainer',          maxPoints },
+                { id: 'httpRequestsChart', container: 'httpRequestsChartContainer', maxPoints },
+                { id: 'RAMChart',          container: 'RAMChartContainer',          maxPoints },
+                { id: 'LoadAvgChart',      container: 'LoadAvgChartContainer',      maxPoints },
+                { id: 'NetworkChart',      container: 'NetworkChartContainer',      maxPoints },
+                { id: 'DiskIOChart',       container: 'DiskIOChartContainer',       maxPoints },
             ];
 
             _.each(this.charts, chart => {
@@ -265,9 +458,10 @@ const Monitoring = Nedara.createWidget({
                 inner.style.cssText = 'width:100%;height:100%';
                 outer.appendChild(inner);
                 this[chart.id] = this.createLightweightChart(chart.container);
+                this.observeChartVisibility(outer);
 
                 _.each(wc.chart_info, info => {
-                    this.seriesData[chart.id][info.label] = [];
+                    this.seriesData[chart.id][info.label] = new SeriesBuffer(chart.maxPoints);
                     const series = this[chart.id].addSeries(window.LightweightCharts.AreaSeries, {
                         title: info.label, color: info.color,
                         lineColor: info.color, lineWidth: 1.5, lineStyle: 0,
@@ -277,6 +471,7 @@ const Monitoring = Nedara.createWidget({
                     });
                     this.chartsInfoMap[chart.id].push({
                         name: info.name, label: info.label, series, color: info.color,
+                        pending: [], renderedCount: 0, needsReset: false,
                     });
                     this.loadHistoricalData(chart.id, info.label, chart.maxPoints);
                 });
@@ -472,11 +667,10 @@ const Monitoring = Nedara.createWidget({
         this.updateDatabaseSelector([...allDatabases].sort());
         this.updateServerSelector(linuxServers);
 
-        // Push new data points to charts
+        // Buffer new data points; charts are redrawn on the next animation frame
         const now = Math.floor(Date.now() / 1000);
         _.each(this.charts, conf => {
-            const chart = this[conf.id];
-            if (!chart || chart.isPaused) return;
+            if (!this[conf.id]) return;
 
             _.each(this.chartsInfoMap[conf.id], si => {
                 const type = conf.id === 'CPUChart'          ? 'cpu'
@@ -490,21 +684,16 @@ const Monitoring = Nedara.createWidget({
                 const row = chartDataMap[si.label];
                 if (!row) return;
 
-                const sd = this.seriesData[conf.id][si.label];
-                if (!sd) return;
+                const buffer = this.seriesData[conf.id][si.label];
+                if (!buffer) return;
 
-                let ts = now;
-                if (sd.length && ts <= sd[sd.length - 1].time) ts = sd[sd.length - 1].time + 1;
-                sd.push({ time: ts, value: row[type] || 0 });
-
-                const trimmed = this.ensureUniqueTimestamps(sd.slice(-conf.maxPoints));
-                si.series.setData(trimmed);
+                const value = row[type] || 0;
+                const time  = buffer.push(now, value);
+                if (si.pending.length < MAX_PENDING_POINTS) si.pending.push({ time, value });
+                else si.needsReset = true;
             });
 
-            chart.timeScale().fitContent();
-
-            const inner = document.getElementById(conf.container);
-            if (inner) chart.resize(inner.clientWidth, inner.clientHeight);
+            this._markChartDirty(conf.id);
         });
 
         document.getElementById('last-update-time').textContent = this.formatTime(new Date());
@@ -562,6 +751,62 @@ const Monitoring = Nedara.createWidget({
         }
     },
 
+    // ——————————————————————————————————————————
+    // COLLECTOR STATUS
+    // ——————————————————————————————————————————
+
+    renderCollectorStatus: function (data) {
+        const upd = (id, v) => { const el = document.getElementById(id); if (el) el.textContent = v; };
+        upd('cs-ticks',    data.ticks);
+        upd('cs-overruns', data.overruns);
+        upd('cs-last-tick', `${data.last_tick_ms.toFixed(0)} ms`);
+        upd('cs-first-snapshot', data.first_snapshot_seconds === null ? '—' : `${data.first_snapshot_seconds} s`);
+        upd('cs-pending',  data.pending_targets);
+        upd('cs-clients',  data.clients);
+        upd('cs-awaiting', data.clients_awaiting_ack);
+        upd('cs-hidden',   data.clients_hidden);
+        upd('cs-refresh',  `${data.refresh_rate} s`);
+
+        const timingsTbody = document.querySelector('#collector-timings tbody');
+        if (timingsTbody) {
+            const rows = [];
+            _.each(data.timings, (phases, target) => {
+                _.each(phases, (h, phase) => rows.push({ target, phase, ...h }));
+            });
+            timingsTbody.innerHTML = rows
+                .sort((a, b) => b.p95_ms - a.p95_ms)
+                .map(r => `<tr>
+                    <td>${_.escape(r.target)}</td>
+                    <td>${r.phase}</td>
+                    <td>${r.count}</td>
+                    <td>${r.avg_ms.toFixed(1)} ms</td>
+                    <td>${r.p50_ms.toFixed(1)} ms</td>
+                    <td class="${r.p95_ms > data.refresh_rate * 1000 ? 'value-high' : ''}">${r.p95_ms.toFixed(1)} ms</td>
+                    <td>${r.max_ms.toFixed(1)} ms</td>
+                </tr>`).join('');
+        }
+
+        const alertsTbody = document.querySelector('#collector-alerts tbody');
+        if (alertsTbody) {
+            alertsTbody.innerHTML = (data.alerts || []).map(a => `<tr>
+                <td class="value-high">${_.escape(a.rule)}</td>
+                <td>${_.escape(a.target)}</td>
+                <td>${a.value}</td>
+                <td>${a.for_seconds} s</td>
+                <td>${a.notified === null ? '—' : (a.notified ? 'Yes' : 'Pending')}</td>
+            </tr>`).join('');
+        }
+
+        const errorsTbody = document.querySelector('#collector-errors tbody');
+        if (errorsTbody) {
+            errorsTbody.innerHTML = _.map(data.errors, (e, target) => `<tr>
+                <td>${_.escape(target)}</td>
+                <td class="truncate" title="${_.escape(e.message)}">${_.escape(e.message)}</td>
+                <td>${e.at}</td>
+            </tr>`).join('');
+        }
+    },
+
     // ——————————————————————————————————————————
     // UTILITIES
     // ——————————————————————————————————————————
@@ -585,19 +830,6 @@ const Monitoring = Nedara.createWidget({
         return d.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit', second: '2-digit' });
     },
 
-    ensureUniqueTimestamps: function (data) {
-        if (!data || !data.length) return data;
-        data.sort((a, b) => a.time - b.time);
-        const out = []; let last = null;
-        data.forEach(item => {
-            let t = item.time;
-            if (last !== null && t <= last) t = last + 1;
-            out.push({ time: t, value: item.value });
-            last = t;
-        });
-        return out;
-    },
-
     updateOverallStatus: function () {
         const hasCrit = this.$container.find('.status-critical').not('#overall-status').length;
         const hasWarn = this.$container.find('.status-warning').not('#overall-status').length;
@@ -819,6 +1051,19 @@ const Monitoring = Nedara.createWidget({
         $closeBtn.on('click', (e) => { e.stopPropagation(); close(); });
     },
 
+    _onCollectorStatusClick: function (ev) {
+        ev.preventDefault();
+        const $modal = $(Nedara.renderTemplate('modal-collector-status', { environment: this.env }));
+        $('body').append($modal);
+
+        this.socket.emit('get_collector_status');
+        const poll = setInterval(() => this.socket.emit('get_collector_status'), 2000);
+
+        const close = () => { clearInterval(poll); $modal.remove(); };
+        $modal.find('#close-collector-status').on('click', close);
+        $modal.find('#collector-status-overlay').on('click', e => { if (e.target.id === 'collector-status-overlay') close(); });
+    },
+
     _onRefreshInterfaceBtnClick: function () {
         window.location.reload();
     },
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Production entry point.
+
+    gunicorn -k gevent -w 1 -b 0.0.0.0:5000 wsgi:app
+
+The gevent worker monkey-patches the process before this module is imported,
+so app.py switches Flask-SocketIO to its gevent mode automatically.
+"""
+
+from app import app, start_collectors
+
+start_collectors()